@@ -1,17 +1,27 @@
 import os
+import sys
+import copy
+import functools
 import datetime
-import pandas as pd
+import itertools
+import operator
+import numpy as np
 import xmlrpc.client
 import io
-import matplotlib.pyplot as plt
+import hashlib
+import pickle
+import time
+import threading
+import queue
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
 from docx.oxml import OxmlElement, parse_xml
 from docx.oxml.ns import qn, nsdecls
+from lxml import etree
 from dotenv import load_dotenv
 import streamlit as st
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from collections import Counter, defaultdict
 
 # Load environment variables from .env file
 load_dotenv()
@@ -22,6 +32,22 @@ ODOO_DB = st.secrets["odoo"]["ODOO_DB"]
 ODOO_USERNAME = st.secrets["odoo"]["ODOO_USERNAME"]
 ODOO_PASSWORD = st.secrets["odoo"]["ODOO_PASSWORD"]
 
+# Odoo stores datetimes in UTC; deadlines are reported in UTC+3.
+TZ_PLUS3 = datetime.timezone(datetime.timedelta(hours=3))
+
+# Week reports and their Word documents are cached in memory for this long, and raw Odoo reads on disk as well.
+# The two expire independently: after a restart a report can be built from a disk entry that is nearly this old
+# and then kept for this long again, so planning edits in Odoo show up within twice this (an hour) at most.
+REPORT_CACHE_TTL = 1800
+
+# Raw Odoo reads are also pickled here, so a restarted app doesn't start with a cold cache.
+DISK_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+# The pie chart figure is built on first use and redrawn per report; the lock serialises Streamlit sessions.
+# pandas and matplotlib are imported lazily so app reruns before "Run Analysis" don't pay for them.
+_PIE_AXES = None
+_PIE_LOCK = threading.Lock()
+
 def set_collapsible(paragraph):
     """
     Attempts to add a collapsible property to a heading by injecting <w:collapse>.
@@ -34,296 +60,347 @@ def set_collapsible(paragraph):
     collapse.set(qn('w:val'), "true")
     pPr.append(collapse)
 
-def set_cell_shading(cell, fill="D9E1F2"):
-    """
-    Sets the background shading of a cell.
-    Default fill color is a light blue.
-    """
-    shading_elm = parse_xml(r'<w:shd {} w:fill="{}"/>'.format(nsdecls('w'), fill))
-    cell._tc.get_or_add_tcPr().append(shading_elm)
+def _shading_xml(fill):
+    return r'<w:shd {} w:fill="{}"/>'.format(nsdecls('w'), fill)
 
-def set_cell_margin(cell, margin=100):
-    """
-    Sets uniform cell margins (in dxa units; 100 dxa ≃ 0.07 inches) for the given cell.
-    """
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
-    margins = parse_xml(
-        f'<w:tcMar xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+def _table_cell_margin_xml(margin):
+    return (
+        f'<w:tblCellMar xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
         f'<w:top w:w="{margin}" w:type="dxa"/>'
         f'<w:left w:w="{margin}" w:type="dxa"/>'
         f'<w:bottom w:w="{margin}" w:type="dxa"/>'
         f'<w:right w:w="{margin}" w:type="dxa"/>'
-        f'</w:tcMar>'
+        f'</w:tblCellMar>'
     )
-    tcPr.append(margins)
 
-def set_column_widths(table, widths):
+# Each tcPr is parsed once per fill; build_tr deep-copies it per cell.
+@functools.lru_cache(maxsize=None)
+def _cell_props_template(fill):
+    """Parses a <w:tcPr>, carrying the shading when fill is set; margins come from the table."""
+    shading = _shading_xml(fill) if fill else ""
+    return parse_xml(f'<w:tcPr {nsdecls("w")}>{shading}</w:tcPr>')
+
+def add_report_table(document, cols, margin=100):
     """
-    Sets the width for each column in the table. 
-    widths should be a list of Inches objects matching the number of columns.
+    Adds an empty "Table Grid" table whose cells all default to uniform margins (in dxa units),
+    set once in <w:tblCellMar> rather than on every cell.
     """
-    for row in table.rows:
-        for idx, cell in enumerate(row.cells):
-            cell.width = widths[idx]
-            set_cell_margin(cell, margin=100)
+    table = document.add_table(rows=0, cols=cols)
+    table.style = "Table Grid"
+    tblPr = table._tbl.tblPr
+    cell_mar = parse_xml(_table_cell_margin_xml(margin))
+    tbl_look = tblPr.find(qn('w:tblLook'))
+    if tbl_look is not None:
+        tbl_look.addprevious(cell_mar)
+    else:
+        tblPr.append(cell_mar)
+    return table
 
-def authenticate_odoo():
-    """Authenticate with Odoo and return UID, models object."""
+_XML_SPACE = '{http://www.w3.org/XML/1998/namespace}space'
+
+# Cell options for the shaded, bold, centered header rows of the report tables.
+HEADER_CELL = {'bold': True, 'center': True, 'shading': "D9E1F2"}
+
+def build_tr(table, cells, widths=None):
+    """
+    Appends a row to the table, building the <w:tr> directly with lxml SubElement
+    instead of going through python-docx's add_row() and per-cell/run setters.
+    Each cell is a (content, options) pair: content is a string or a list of (text, hex_color_or_None) runs,
+    and options may set 'bold', 'center', 'shading' (a fill color) and 'span' (grid columns to merge across).
+    Widths default to the table grid; cell margins come from the table (see add_report_table).
+    """
+    tbl = table._tbl
+    if widths is None:
+        widths = [grid_col.w for grid_col in tbl.tblGrid.gridCol_lst]
+    tr = etree.SubElement(tbl, qn('w:tr'))
+    for width, (content, options) in zip(widths, cells):
+        tc = etree.SubElement(tr, qn('w:tc'))
+        # Shading comes from one cached tcPr; only the width differs per cell.
+        tcPr = copy.deepcopy(_cell_props_template(options.get('shading')))
+        tc.append(tcPr)
+        if options.get('span'):
+            gridSpan = etree.Element(qn('w:gridSpan'))
+            gridSpan.set(qn('w:val'), str(options['span']))
+            tcPr.insert(0, gridSpan)
+        if width is not None:
+            tcW = etree.Element(qn('w:tcW'))
+            tcW.set(qn('w:w'), str(width.twips))
+            tcW.set(qn('w:type'), 'dxa')
+            tcPr.insert(0, tcW)
+        p = etree.SubElement(tc, qn('w:p'))
+        if options.get('center'):
+            pPr = etree.SubElement(p, qn('w:pPr'))
+            etree.SubElement(pPr, qn('w:jc')).set(qn('w:val'), 'center')
+        runs = [(content, None)] if isinstance(content, str) else content
+        for text, color in runs:
+            r = etree.SubElement(p, qn('w:r'))
+            if options.get('bold') or color:
+                rPr = etree.SubElement(r, qn('w:rPr'))
+                if options.get('bold'):
+                    etree.SubElement(rPr, qn('w:b'))
+                if color:
+                    etree.SubElement(rPr, qn('w:color')).set(qn('w:val'), color)
+            t = etree.SubElement(r, qn('w:t'))
+            t.set(_XML_SPACE, 'preserve')
+            t.text = text
+    return tr
+
+def append_row(table, cells):
+    """
+    Appends a plain data row; each entry in cells is a string or a list of (text, hex_color_or_None) runs.
+    """
+    return build_tr(table, [(content, {}) for content in cells])
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def get_odoo_uid():
+    """Logs in to Odoo and returns the UID; shared by all sessions and refreshed hourly."""
     common = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/common")
     uid = common.authenticate(ODOO_DB, ODOO_USERNAME, ODOO_PASSWORD, {})
-    models = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/object")
-    return uid, models
+    # Raising keeps a rejected login out of the cache, so fixed credentials take effect on the next run.
+    if not uid:
+        raise RuntimeError("Odoo authentication failed; check the odoo credentials in the Streamlit secrets.")
+    return uid
+
+@st.cache_resource(show_spinner=False)
+def get_models_pool():
+    """
+    Returns the pool of idle object ServerProxies shared by all sessions.
+    A proxy holds a single keep-alive connection and must not be used by two threads at once,
+    so callers borrow one for the duration of a call; LIFO order keeps the warmest connections busy.
+    """
+    return queue.LifoQueue()
+
+def call_with_pooled_models(pool, func, *args):
+    """
+    Runs an Odoo helper with a proxy borrowed from pool, creating one if none is idle.
+    The pool is passed in because st.cache_resource only caches on the script thread, not in executor workers.
+    """
+    try:
+        models = pool.get_nowait()
+    except queue.Empty:
+        models = xmlrpc.client.ServerProxy(f"{ODOO_URL}/xmlrpc/2/object")
+    try:
+        return func(models, *args)
+    finally:
+        pool.put(models)
+
+def _sweep_disk_cache(ttl):
+    """Deletes cache pickles and leftover temp files in DISK_CACHE_DIR older than ttl seconds."""
+    try:
+        names = os.listdir(DISK_CACHE_DIR)
+    except OSError:
+        return
+    cutoff = time.time() - ttl
+    for name in names:
+        if not name.endswith((".pkl", ".tmp")):
+            continue
+        path = os.path.join(DISK_CACHE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.unlink(path)
+        except OSError:
+            pass
+
+def disk_cache(ttl, version):
+    """
+    Caches a function's result as a pickle in DISK_CACHE_DIR, keyed on its name, version, the Odoo server and
+    the arguments; bump version whenever the shape of the result changes so older pickles are never served.
+    Entries older than ttl seconds (by file mtime) are refetched; unreadable ones count as misses,
+    and a failed write only loses the entry, never the result. Each miss also sweeps out expired entries.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            key = repr((func.__qualname__, version, ODOO_URL, ODOO_DB, args)).encode()
+            path = os.path.join(DISK_CACHE_DIR, hashlib.sha256(key).hexdigest() + ".pkl")
+            try:
+                if time.time() - os.path.getmtime(path) < ttl:
+                    with open(path, "rb") as f:
+                        return pickle.load(f)
+            except (OSError, pickle.UnpicklingError, EOFError):
+                pass
+            _sweep_disk_cache(ttl)
+            result = func(*args)
+            # Write to a per-thread temp file and rename, so concurrent sessions never read a partial pickle.
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                os.makedirs(DISK_CACHE_DIR, exist_ok=True)
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+            except OSError:
+                # A read-only or full app directory just leaves this result uncached.
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+            return result
+        return wrapper
+    return decorator
+
+def parse_odoo_datetime(value):
+    """Parses an Odoo 'YYYY-MM-DD[ HH:MM:SS]' string (or ISO 'T' variant) into a datetime."""
+    return datetime.datetime.fromisoformat(value.replace('T', ' '))
+
+def _id(value):
+    """Returns the ID of an Odoo many2one value ([id, display_name] or False), or None when unset."""
+    return value[0] if value else None
+
+def _name(value):
+    """Returns the display name of an Odoo many2one value ([id, display_name] or False), or None when unset."""
+    return value[1] if value else None
+
+def _intern(value):
+    """Interns a display string so names repeated across slots share one object in the cached report."""
+    return sys.intern(value) if value else value
 
 def get_sunday_friday_range():
-    """Returns (start_of_week, end_of_week) for the current work week (Sunday–Friday)."""
+    """
+    Returns (start_of_week, end_of_week, end_inclusive_dt) for the current work week (Sunday–Friday).
+    end_inclusive_dt is the last instant of Friday, for datetime domain bounds.
+    """
     today = datetime.date.today()
-    diff = today.weekday() - 6
-    if diff < 0:
-        diff += 7
-    start_of_week = today - datetime.timedelta(days=diff)
+    days_since_sunday = (today.weekday() + 1) % 7
+    start_of_week = today - datetime.timedelta(days=days_since_sunday)
     end_of_week = start_of_week + datetime.timedelta(days=5)
-    return start_of_week, end_of_week
-
-def get_designer_ids_from_planning(models, uid, start_date, end_date):
-    """Queries planning.slot for the given date range and returns IDs of designers."""
-    slots = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'planning.slot', 'search_read',
-        [[('start_datetime', '>=', start_date), ('end_datetime', '<=', end_date)]],
-        {'fields': ['resource_id']}
-    )
-    resource_ids = {
-        slot['resource_id'][0] if isinstance(slot.get('resource_id'), list) else slot.get('resource_id')
-        for slot in slots if slot.get('resource_id')
-    }
-    if not resource_ids:
-        return []
-    employees = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'hr.employee', 'search_read',
-        [[('id', 'in', list(resource_ids))]],
-        {'fields': ['id', 'name', 'job_title']}
-    )
-    designer_ids = [emp['id'] for emp in employees if 'designer' in (emp.get('job_title') or '').lower()]
-    return designer_ids
+    end_inclusive_dt = datetime.datetime.combine(end_of_week, datetime.time.max)
+    return start_of_week, end_of_week, end_inclusive_dt
 
-def read_employee_info(models, uid, employee_ids):
-    """Retrieves full employee records for the given IDs."""
-    if not employee_ids:
-        return []
-    return models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'hr.employee', 'search_read',
-        [[('id', 'in', employee_ids)]],
-        {'fields': ['id', 'name', 'job_title', 'user_id']}
-    )
+def get_designers_from_slots(slots):
+    """Returns {employee_id: name} from the [id, display_name] employee of each fetched planning slot."""
+    return {_id(slot['employee_id']): _name(slot['employee_id']) for slot in slots if slot.get('employee_id')}
 
-def get_all_timesheet_hours(models, uid, designer_ids, start_date, end_date):
-    """Retrieves timesheet hours for the given designer IDs."""
-    if not designer_ids:
-        return {}
-    timesheets = models.execute_kw(
+def get_all_timesheet_hours(models, uid, start_date, end_date):
+    """
+    Retrieves timesheet hours of designers in the date range, summed per employee by Odoo.
+    The job title is matched inside the domain, so the call doesn't wait on the planning lookup.
+    """
+    groups = models.execute_kw(
         ODOO_DB, uid, ODOO_PASSWORD,
-        'account.analytic.line', 'search_read',
-        [[('employee_id', 'in', designer_ids),
+        'account.analytic.line', 'read_group',
+        [[('employee_id.job_title', 'ilike', 'designer'),
           ('date', '>=', start_date),
-          ('date', '<=', end_date)]],
-        {'fields': ['employee_id', 'unit_amount']}
-    )
-    timesheet_dict = defaultdict(float)
-    for ts in timesheets:
-        emp_field = ts.get('employee_id')
-        if emp_field:
-            emp_id = emp_field[0] if isinstance(emp_field, list) else emp_field
-            timesheet_dict[emp_id] += float(ts.get('unit_amount', 0))
-    return dict(timesheet_dict)
-
-def get_all_scheduled_data(models, uid, designer_ids, start_date, end_date):
-    """Retrieves scheduling data (hours and projects) from planning.slot."""
-    if not designer_ids:
-        return {}
-    slots = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'planning.slot', 'search_read',
-        [[('resource_id', 'in', designer_ids),
-          ('start_datetime', '>=', start_date),
-          ('end_datetime', '<=', end_date)]],
-        {'fields': ['resource_id', 'start_datetime', 'end_datetime', 'project_id']}
-    )
-    scheduled_data = {}
-    for slot in slots:
-        res_field = slot.get('resource_id')
-        if not res_field:
-            continue
-        emp_id = res_field[0] if isinstance(res_field, list) else res_field
-        if emp_id not in scheduled_data:
-            scheduled_data[emp_id] = {'hours': 0.0, 'projects': set()}
-        start = pd.to_datetime(slot['start_datetime'])
-        end = pd.to_datetime(slot['end_datetime'])
-        hours = (end - start).total_seconds() / 3600.0
-        scheduled_data[emp_id]['hours'] += hours
-        project_field = slot.get('project_id')
-        if project_field:
-            project_name = project_field[1] if isinstance(project_field, list) else str(project_field)
-            scheduled_data[emp_id]['projects'].add(project_name)
-    return scheduled_data
-
-def get_subtask_service_categories(models, uid, designer_ids, start_date, end_date):
-    """For planning slots with subtask references, retrieves the service category."""
-    if not designer_ids:
-        return {}
-    main_slots = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'planning.slot', 'search_read',
-        [[('resource_id', 'in', designer_ids),
-          ('start_datetime', '>=', start_date),
-          ('end_datetime', '<=', end_date),
-          ('x_studio_sub_task_1', '!=', False)]],
-        {'fields': ['resource_id', 'x_studio_sub_task_1']}
+          ('date', '<=', end_date)],
+         ['unit_amount', 'employee_id'],
+         ['employee_id']],
+        {'lazy': False}
     )
-    emp_task_pairs = []
-    for slot in main_slots:
-        res_field = slot.get('resource_id')
-        if not res_field:
-            continue
-        emp_id = res_field[0] if isinstance(res_field, list) else res_field
-        subtask_field = slot.get('x_studio_sub_task_1')
-        if not subtask_field:
-            continue
-        task_id = subtask_field[0] if isinstance(subtask_field, list) else subtask_field
-        emp_task_pairs.append((emp_id, task_id))
-    unique_task_ids = list({task_id for (_, task_id) in emp_task_pairs})
-    if not unique_task_ids:
-        return {}
-    tasks_data = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'project.task', 'read',
-        [unique_task_ids],
-        {'fields': ['x_studio_service_category_1']}
-    )
-    task_cat_map = {}
-    for task in tasks_data:
-        cat_field = task.get('x_studio_service_category_1')
-        if cat_field:
-            cat_name = cat_field[1] if isinstance(cat_field, list) else str(cat_field)
-            task_cat_map[task['id']] = cat_name
-    categories_dict = {}
-    for emp_id, task_id in emp_task_pairs:
-        cat_name = task_cat_map.get(task_id)
-        if cat_name:
-            if emp_id not in categories_dict:
-                categories_dict[emp_id] = set()
-            categories_dict[emp_id].add(cat_name)
-    return categories_dict
-
-def get_parent_task_due_dates(models, uid, designer_ids, start_date, end_date):
-    """For planning slots with parent task references, retrieves and converts the deadline."""
-    if not designer_ids:
-        return {}
-    main_slots = models.execute_kw(
+    timesheet_dict = {}
+    for group in groups:
+        emp_id = _id(group.get('employee_id'))
+        if emp_id:
+            timesheet_dict[emp_id] = float(group.get('unit_amount') or 0)
+    return timesheet_dict
+
+def fetch_all_slots(models, uid, start_date, end_date):
+    """
+    Retrieves every designer planning.slot in the date range, with all fields the report uses.
+    The job-title check follows the slot's employee inside the domain, so the slots also define which
+    designers are in the report. Slots are keyed on employee_id, the same hr.employee id the timesheets use.
+    """
+    return models.execute_kw(
         ODOO_DB, uid, ODOO_PASSWORD,
         'planning.slot', 'search_read',
-        [[('resource_id', 'in', designer_ids),
-          ('start_datetime', '>=', start_date),
+        [[('start_datetime', '>=', start_date),
           ('end_datetime', '<=', end_date),
-          ('x_studio_parent_task', '!=', False)]],
-        {'fields': ['resource_id', 'x_studio_parent_task']}
+          ('employee_id.job_title', 'ilike', 'designer')]],
+        {'fields': ['employee_id', 'allocated_hours', 'project_id',
+                    'x_studio_sub_task_1', 'x_studio_parent_task']}
     )
-    emp_task_pairs = []
-    for slot in main_slots:
-        res_field = slot.get('resource_id')
-        if not res_field:
-            continue
-        emp_id = res_field[0] if isinstance(res_field, list) else res_field
-        parent_field = slot.get('x_studio_parent_task')
-        if not parent_field:
-            continue
-        task_id = parent_field[0] if isinstance(parent_field, list) else parent_field
-        emp_task_pairs.append((emp_id, task_id))
-    unique_task_ids = list({task_id for (_, task_id) in emp_task_pairs})
-    if not unique_task_ids:
+
+def fetch_tasks_for_slots(models, uid, slots):
+    """Reads the subtasks and parent tasks referenced by the slots in one call; returns {task_id: task}."""
+    task_ids = {
+        _id(slot.get(task_field))
+        for slot in slots
+        for task_field in ('x_studio_sub_task_1', 'x_studio_parent_task')
+    }
+    task_ids.discard(None)
+    if not task_ids:
         return {}
     tasks_data = models.execute_kw(
         ODOO_DB, uid, ODOO_PASSWORD,
         'project.task', 'read',
-        [unique_task_ids],
-        {'fields': ['x_studio_internal_due_date_1']}
+        [list(task_ids)],
+        {'fields': ['x_studio_service_category_1', 'x_studio_internal_due_date_1']}
     )
-    task_due_map = {}
-    for task in tasks_data:
-        raw_date = task.get('x_studio_internal_due_date_1')
-        if raw_date:
-            try:
-                dt_parsed = pd.to_datetime(raw_date)
-                if dt_parsed.tzinfo is None:
-                    dt_parsed = dt_parsed.replace(tzinfo=datetime.timezone.utc)
-                dt_local = dt_parsed.astimezone(datetime.timezone(datetime.timedelta(hours=3)))
-                due_date_str = dt_local.strftime('%Y-%m-%d %H:%M:%S')
-            except Exception:
-                due_date_str = str(raw_date)
-            task_due_map[task['id']] = due_date_str
-    deadlines_dict = {}
-    for emp_id, task_id in emp_task_pairs:
-        due_date_str = task_due_map.get(task_id)
-        if due_date_str:
-            if emp_id not in deadlines_dict:
-                deadlines_dict[emp_id] = set()
-            deadlines_dict[emp_id].add(due_date_str)
-    return deadlines_dict
-
-def get_project_breakdown(models, uid, designer_ids, start_date, end_date):
-    """Builds a breakdown for each employee: {emp_id: {project_name: {project_type: count, ...}}}."""
-    slots = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'planning.slot', 'search_read',
-        [[('resource_id', 'in', designer_ids),
-          ('start_datetime', '>=', start_date),
-          ('end_datetime', '<=', end_date)]],
-        {'fields': ['resource_id', 'project_id', 'x_studio_sub_task_1']}
-    )
-    task_ids = set()
-    for slot in slots:
-        if slot.get('x_studio_sub_task_1'):
-            subtask_field = slot.get('x_studio_sub_task_1')
-            task_id = subtask_field[0] if isinstance(subtask_field, list) else subtask_field
-            task_ids.add(task_id)
-    task_cat_map = {}
-    if task_ids:
-        tasks_data = models.execute_kw(
-            ODOO_DB, uid, ODOO_PASSWORD,
-            'project.task', 'read',
-            [list(task_ids)],
-            {'fields': ['x_studio_service_category_1']}
-        )
-        for task in tasks_data:
-            cat_field = task.get('x_studio_service_category_1')
-            if cat_field:
-                cat_name = cat_field[1] if isinstance(cat_field, list) else str(cat_field)
-            else:
-                cat_name = None
-            task_cat_map[task['id']] = cat_name
-    breakdown = {}
+    return {task['id']: task for task in tasks_data}
+
+def to_local_deadline_str(raw_date):
+    """Converts an Odoo UTC due date to a UTC+3 'YYYY-MM-DD HH:MM:SS' string, or str(raw_date) if unparseable."""
+    try:
+        dt_parsed = parse_odoo_datetime(raw_date)
+        if dt_parsed.tzinfo is None:
+            dt_parsed = dt_parsed.replace(tzinfo=datetime.timezone.utc)
+        return dt_parsed.astimezone(TZ_PLUS3).strftime('%Y-%m-%d %H:%M:%S')
+    except Exception:
+        return str(raw_date)
+
+def build_slot_frame(slots, tasks):
+    """
+    Flattens the fetched planning slots into a DataFrame with one row per slot and the columns the report groups on:
+    emp_id, project_name, project_type (subtask service category), hours, deadline (parent task due date)
+    and deadline_type (parent task service category). Missing values are left as None.
+    """
+    # Many slots share a subtask or parent task, so each task's values are resolved once.
+    category_by_task = {}
+    deadline_by_task = {}
+    rows = []
     for slot in slots:
-        res_field = slot.get('resource_id')
-        if not res_field:
+        emp_id = _id(slot.get('employee_id'))
+        if not emp_id:
             continue
-        emp_id = res_field[0] if isinstance(res_field, list) else res_field
-        if emp_id not in breakdown:
-            breakdown[emp_id] = {}
-        project_field = slot.get('project_id')
-        if not project_field:
-            continue
-        project_name = project_field[1] if isinstance(project_field, list) else str(project_field)
+        project_name = _intern(_name(slot.get('project_id')))
         project_type = None
-        if slot.get('x_studio_sub_task_1'):
-            subtask_field = slot.get('x_studio_sub_task_1')
-            task_id = subtask_field[0] if isinstance(subtask_field, list) else subtask_field
-            project_type = task_cat_map.get(task_id)
-        type_key = project_type if project_type is not None else "No Type"
-        if project_name not in breakdown[emp_id]:
-            breakdown[emp_id][project_name] = {}
-        breakdown[emp_id][project_name][type_key] = breakdown[emp_id][project_name].get(type_key, 0) + 1
+        task_id = _id(slot.get('x_studio_sub_task_1'))
+        if task_id:
+            if task_id not in category_by_task:
+                category_by_task[task_id] = _intern(_name(tasks.get(task_id, {}).get('x_studio_service_category_1')))
+            project_type = category_by_task[task_id]
+        deadline = deadline_type = None
+        task_id = _id(slot.get('x_studio_parent_task'))
+        if task_id:
+            if task_id not in deadline_by_task:
+                task = tasks.get(task_id, {})
+                raw_date = task.get('x_studio_internal_due_date_1')
+                deadline_by_task[task_id] = (
+                    _intern(to_local_deadline_str(raw_date)) if raw_date else None,
+                    _intern(_name(task.get('x_studio_service_category_1'))),
+                )
+            deadline, deadline_type = deadline_by_task[task_id]
+        rows.append((emp_id, project_name, project_type, slot.get('allocated_hours') or 0.0, deadline, deadline_type))
+    import pandas as pd
+    return pd.DataFrame(rows, columns=['emp_id', 'project_name', 'project_type', 'hours', 'deadline', 'deadline_type'])
+
+def _sets_by_employee(slot_frame, column):
+    """Groups the non-empty values of a slot frame column into {emp_id: set(values)}."""
+    values = slot_frame.dropna(subset=[column])
+    return values.groupby('emp_id', sort=False)[column].agg(frozenset).to_dict()
+
+def get_all_scheduled_data(slot_frame):
+    """Computes scheduling data (hours and projects) per employee from the planning slot frame."""
+    hours_by_emp = slot_frame.groupby('emp_id', sort=False)['hours'].sum().to_dict()
+    projects_by_emp = _sets_by_employee(slot_frame, 'project_name')
+    return {
+        emp_id: {'hours': hours, 'projects': projects_by_emp.get(emp_id, frozenset())}
+        for emp_id, hours in hours_by_emp.items()
+    }
+
+def get_subtask_service_categories(slot_frame):
+    """For planning slots with subtask references, collects the service category per employee."""
+    return _sets_by_employee(slot_frame, 'project_type')
+
+def get_parent_task_due_dates(slot_frame):
+    """For planning slots with parent task references, collects the converted deadline per employee."""
+    return _sets_by_employee(slot_frame, 'deadline')
+
+def get_project_breakdown(slot_frame):
+    """Builds a breakdown for each employee: {emp_id: {project_name: {project_type: count, ...}}}."""
+    breakdown = {emp_id: defaultdict(Counter) for emp_id in slot_frame['emp_id'].unique().tolist()}
+    with_project = slot_frame.dropna(subset=['project_name']).fillna({'project_type': "No Type"})
+    for emp_id, project_name, type_key in zip(
+            with_project['emp_id'], with_project['project_name'], with_project['project_type']):
+        breakdown[emp_id][project_name][type_key] += 1
     return breakdown
 
 def format_project_breakdown_for_employee(breakdown_for_employee):
@@ -349,15 +426,12 @@ def aggregate_project_breakdowns(project_breakdown_dict):
     Returns a dictionary where each key is a project type (or "No Type" if missing) and each value is a 
     dictionary mapping project names to their aggregated counts.
     """
-    aggregated = {}
-    for emp_id, emp_breakdown in project_breakdown_dict.items():
+    aggregated = defaultdict(Counter)
+    for emp_breakdown in project_breakdown_dict.values():
         for project_name, type_dict in emp_breakdown.items():
             for project_type, count in type_dict.items():
-                key = project_type if project_type is not None else "No Type"
-                if key not in aggregated:
-                    aggregated[key] = {}
-                aggregated[key][project_name] = aggregated[key].get(project_name, 0) + count
-    return aggregated
+                aggregated[project_type if project_type is not None else "No Type"][project_name] += count
+    return {key: dict(projects) for key, projects in aggregated.items()}
 
 def get_availability_guess_coded(designer_name, timesheet_hours, scheduled_hours):
     """Computes available hours and returns a guess string."""
@@ -373,132 +447,105 @@ def get_availability_guess_coded(designer_name, timesheet_hours, scheduled_hours
         guess = "Not Available"
     return available_hours, guess
 
-def create_deadline_pie_chart(deadline_list):
+def _datetime64_or_nat(value):
+    try:
+        return np.datetime64(value, 's')
+    except ValueError:
+        return np.datetime64('NaT')
+
+def days_until(deadline_list):
+    """
+    Returns the whole days from now until each deadline string as an int64 array, floored like timedelta.days.
+    Unparseable deadlines come out as -1, so the usual days >= 0 filters drop them along with past ones.
+    """
+    try:
+        deadlines = np.array(deadline_list, dtype='datetime64[s]')
+    except ValueError:
+        deadlines = np.array([_datetime64_or_nat(d_str) for d_str in deadline_list], dtype='datetime64[s]')
+    now = np.datetime64(datetime.datetime.now(), 's')
+    days = (deadlines - now).astype(np.int64) // 86400
+    return np.where(np.isnat(deadlines), -1, days)
+
+def bucket_deadlines(deadline_tally):
     """
-    Creates a pie chart image from a list of deadline strings, with a larger figure size.
+    Counts upcoming deadlines in one vectorized pass and returns (red, yellow, green):
     - Next week (0-6 days) => red
     - Next 2 weeks (7-13 days) => yellow
     - Beyond 2 weeks (>=14 days) => green
-    If no valid deadlines are found, creates a placeholder chart.
-    Returns an image buffer.
+    deadline_tally is a Counter of deadline string -> occurrences, so each distinct string is parsed once.
+    Past and unparseable deadlines are ignored.
     """
-    now = datetime.datetime.now()
-    red = yellow = green = 0
-    for d_str in deadline_list:
-        try:
-            d = pd.to_datetime(d_str).to_pydatetime()
-        except Exception:
-            continue
-        delta = (d - now).days
-        if delta < 0:
-            continue  # ignore past deadlines
-        elif delta < 7:
-            red += 1
-        elif delta < 14:
-            yellow += 1
-        else:
-            green += 1
+    if not deadline_tally:
+        return 0, 0, 0
+    days = days_until(list(deadline_tally))
+    weights = np.fromiter(deadline_tally.values(), dtype=np.int64, count=len(deadline_tally))
+    upcoming = days >= 0
+    buckets = np.bincount(np.digitize(days[upcoming], [7, 14]), weights=weights[upcoming], minlength=3)
+    red, yellow, green = buckets.astype(np.int64).tolist()
+    return red, yellow, green
+
+def _get_pie_axes():
+    """Returns the shared pie chart axes, importing matplotlib and building the figure on first call."""
+    global _PIE_AXES
+    if _PIE_AXES is None:
+        import matplotlib
+        matplotlib.use("Agg")
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        figure = Figure(figsize=(6, 6), dpi=100, layout="tight")
+        FigureCanvasAgg(figure)
+        _PIE_AXES = figure.add_subplot(111)
+    return _PIE_AXES
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def create_deadline_pie_chart(deadline_counts):
+    """
+    Creates a pie chart image from (red, yellow, green) deadline counts (see bucket_deadlines),
+    with a larger figure size.
+    If there are no upcoming deadlines, creates a placeholder chart.
+    Returns PNG bytes, cached per counts tuple so the report and the preview draw it once.
+    """
+    red, yellow, green = deadline_counts
     counts = [red, yellow, green]
-    fig, ax = plt.subplots(figsize=(6, 6))
-    if sum(counts) == 0:
-        ax.pie([1], labels=["No deadlines"], colors=["gray"], autopct='%1.1f%%')
-        ax.axis('equal')
-    else:
-        labels = [f"Next week ({red})", f"Next 2 weeks ({yellow})", f"Beyond 2 weeks ({green})"]
-        colors = ["red", "yellow", "green"]
-        ax.pie(counts, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
-        ax.axis('equal')
-    plt.tight_layout()
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=100)
-    plt.close(fig)
-    buf.seek(0)
-    return buf
+    with _PIE_LOCK:
+        ax = _get_pie_axes()
+        ax.clear()
+        if sum(counts) == 0:
+            ax.pie([1], labels=["No deadlines"], colors=["gray"], autopct='%1.1f%%')
+            ax.axis('equal')
+        else:
+            labels = [f"Next week ({red})", f"Next 2 weeks ({yellow})", f"Beyond 2 weeks ({green})"]
+            colors = ["red", "yellow", "green"]
+            ax.pie(counts, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
+            ax.axis('equal')
+        # Print straight from the Agg canvas; savefig would only re-resolve the format and dpi set above.
+        ax.figure.canvas.print_png(buf)
+    return buf.getvalue()
 
-def get_deadlines_for_week(models, uid, designer_ids, start_date, end_date):
+def get_deadlines_for_week(slot_frame, emp_names):
     """
-    Retrieves planning.slot entries with a parent task (deadline) and corresponding project info.
-    Returns a list of dicts with keys: 'designer', 'project', 'project_type', 'deadline'
-    for deadlines within the next 7 days.
+    Collects planning slots whose parent task deadline falls within the next 7 days, from the slot frame.
+    Designer names are resolved through emp_names ({employee_id: name}).
+    Returns a list of dicts with keys: 'designer', 'project', 'project_type', 'deadline'.
     """
-    slots = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'planning.slot', 'search_read',
-        [[('resource_id', 'in', designer_ids),
-          ('start_datetime', '>=', start_date),
-          ('end_datetime', '<=', end_date),
-          ('x_studio_parent_task', '!=', False)]],
-        {'fields': ['resource_id', 'project_id', 'x_studio_parent_task']}
-    )
-    task_ids = []
-    for slot in slots:
-        parent_task = slot.get('x_studio_parent_task')
-        if parent_task:
-            parent_task = parent_task[0] if isinstance(parent_task, list) else parent_task
-            task_ids.append(parent_task)
-    unique_task_ids = list(set(task_ids))
-    if not unique_task_ids:
+    due = slot_frame.dropna(subset=['deadline'])
+    if due.empty:
         return []
-    tasks_data = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'project.task', 'read',
-        [unique_task_ids],
-        {'fields': ['x_studio_internal_due_date_1', 'x_studio_service_category_1']}
-    )
-    task_info = {}
-    for task in tasks_data:
-        raw_date = task.get('x_studio_internal_due_date_1')
-        try:
-            dt_parsed = pd.to_datetime(raw_date)
-            if dt_parsed.tzinfo is None:
-                dt_parsed = dt_parsed.replace(tzinfo=datetime.timezone.utc)
-            dt_local = dt_parsed.astimezone(datetime.timezone(datetime.timedelta(hours=3)))
-            deadline_str = dt_local.strftime('%Y-%m-%d %H:%M:%S')
-        except Exception:
-            deadline_str = str(raw_date)
-        project_type = None
-        cat_field = task.get('x_studio_service_category_1')
-        if cat_field:
-            project_type = cat_field[1] if isinstance(cat_field, list) else str(cat_field)
-        task_info[task['id']] = {'deadline': deadline_str, 'project_type': project_type}
-    employees = models.execute_kw(
-        ODOO_DB, uid, ODOO_PASSWORD,
-        'hr.employee', 'search_read',
-        [[('id', 'in', designer_ids)]],
-        {'fields': ['id', 'name']}
-    )
-    emp_names = {emp['id']: emp['name'] for emp in employees}
-    deadlines_for_week = []
-    now = datetime.datetime.now(datetime.timezone.utc)
-    for slot in slots:
-        designer_id = None
-        if slot.get('resource_id'):
-            designer_id = slot.get('resource_id')[0] if isinstance(slot.get('resource_id'), list) else slot.get('resource_id')
-        parent_task = slot.get('x_studio_parent_task')
-        if parent_task:
-            parent_task = parent_task[0] if isinstance(parent_task, list) else parent_task
-        if parent_task not in task_info:
-            continue
-        deadline_str = task_info[parent_task]['deadline']
-        try:
-            d_dt = pd.to_datetime(deadline_str)
-        except Exception:
-            continue
-        delta_days = (d_dt - pd.Timestamp.now()).days
-        if 0 <= delta_days < 7:
-            record = {
-                'designer': emp_names.get(designer_id, "Unknown"),
-                'project': None,
-                'project_type': task_info[parent_task]['project_type'],
-                'deadline': deadline_str
-            }
-            project_field = slot.get('project_id')
-            if project_field:
-                record['project'] = project_field[1] if isinstance(project_field, list) else str(project_field)
-            deadlines_for_week.append(record)
-    return deadlines_for_week
+    delta_days = days_until(due['deadline'].tolist())
+    upcoming = due[(delta_days >= 0) & (delta_days < 7)]
+    return [
+        {
+            'designer': emp_names.get(emp_id, "Unknown"),
+            'project': project_name,
+            'project_type': deadline_type,
+            'deadline': deadline
+        }
+        for emp_id, project_name, deadline_type, deadline in zip(
+            upcoming['emp_id'], upcoming['project_name'], upcoming['deadline_type'], upcoming['deadline'])
+    ]
 
-def generate_better_word_doc(designer_info_list, aggregated_breakdown, aggregated_deadlines, deadlines_details):
+def generate_better_word_doc(designer_info_list, aggregated_breakdown, deadline_counts, deadlines_details):
     document = Document()
     # Main title as Heading 1 without the date range.
     heading_paragraph = document.add_heading("Designer Capacity and Availability", 1)
@@ -513,9 +560,13 @@ def generate_better_word_doc(designer_info_list, aggregated_breakdown, aggregate
     
     # ----------------- Create a combined summary table at the top -----------------
     total_designers = len(designer_info_list)
-    total_available_hours = sum(info['capacity'] for info in designer_info_list)
-    # Count designers with any available hours.
-    available_designers = len([info for info in designer_info_list if info['capacity'] > 0])
+    # Total the available hours and count designers with any, in one pass over the list.
+    total_available_hours = 0
+    available_designers = 0
+    for info in designer_info_list:
+        capacity = info['capacity']
+        total_available_hours += capacity
+        available_designers += capacity > 0
     # Assuming each designer works a 40-hour week.
     total_possible_hours = total_designers * 40
     total_assigned_hours = total_possible_hours - total_available_hours
@@ -527,149 +578,90 @@ def generate_better_word_doc(designer_info_list, aggregated_breakdown, aggregate
         f"Utilization: {utilization:.1f}%"
     )
     
-    # Compute Aggregated Project Breakdown Summary.
-    total_tasks_overall = sum(sum(types.values()) for types in aggregated_breakdown.values())
+    # Compute Aggregated Project Breakdown Summary; per-type totals are reused by the breakdown table.
+    type_totals = {project_type: sum(projects.values()) for project_type, projects in aggregated_breakdown.items()}
+    total_tasks_overall = sum(type_totals.values())
     project_summary = f"Project Breakdown Summary: {total_tasks_overall} total tasks"
     
-    # Compute Deadline Breakdown Summary.
-    now = datetime.datetime.now()
-    red = yellow = green = 0
-    for d_str in aggregated_deadlines:
-        try:
-            d = pd.to_datetime(d_str).to_pydatetime()
-        except Exception:
-            continue
-        delta = (d - now).days
-        if delta < 0:
-            continue
-        elif delta < 7:
-            red += 1
-        elif delta < 14:
-            yellow += 1
-        else:
-            green += 1
+    # Deadline Breakdown Summary from the precomputed bucket counts.
+    red, yellow, green = deadline_counts
     deadline_summary = (
         f"Deadline Breakdown Summary: Next week: {red} | Next 2 weeks: {yellow} | Beyond 2 weeks: {green}"
     )
     
     # Create a summary table (3 rows, 1 column) with improved styling.
-    summary_table = document.add_table(rows=3, cols=1)
-    summary_table.style = "Table Grid"
-    for i, summary in enumerate([capacity_summary, project_summary, deadline_summary]):
-        cell = summary_table.rows[i].cells[0]
-        cell.text = summary
-        para = cell.paragraphs[0]
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        for run in para.runs:
-            run.bold = True
-        set_cell_margin(cell, margin=100)
+    summary_table = add_report_table(document, 1)
+    for summary in [capacity_summary, project_summary, deadline_summary]:
+        build_tr(summary_table, [(summary, {'bold': True, 'center': True})])
     document.add_paragraph("")  # Add a spacer paragraph
     
     # ----------------- Main Designer Capacity Table -----------------
     headers = ["Designer", "Available Hours", "Projects", "Project Type", "Deadline"]
-    table = document.add_table(rows=1, cols=len(headers))
-    table.style = "Table Grid"
-    hdr_cells = table.rows[0].cells
-    for i, header in enumerate(headers):
-        hdr_cells[i].text = header
-        para = hdr_cells[i].paragraphs[0]
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        for run in para.runs:
-            run.bold = True
-        set_cell_shading(hdr_cells[i], fill="D9E1F2")
-        set_cell_margin(hdr_cells[i], margin=100)
-    set_column_widths(table, [Inches(1.5)] * len(headers))
+    table = add_report_table(document, len(headers))
+    build_tr(table, [(header, HEADER_CELL) for header in headers], widths=[Inches(1.5)] * len(headers))
     
-    for info in designer_info_list:
-        row_cells = table.add_row().cells
-        row_cells[0].text = info['name']
-        row_cells[1].text = f"{info['capacity']:.1f}"
-        row_cells[2].text = ", ".join(sorted(info.get('projects', []))) or "None"
-        row_cells[3].text = ", ".join(sorted(info.get('subtask_categories', []))) or "None"
-        # Format deadline cell with red font for urgent deadlines.
-        deadline_cell = row_cells[4]
-        para = deadline_cell.paragraphs[0]
-        para.text = ""
-        deadlines = sorted(info.get('parent_deadlines', []))
+    # Designer values arrive pre-sorted and pre-joined from make_designer_info.
+    designer_rows = [
+        (
+            info['name'],
+            f"{info['capacity']:.1f}",
+            info['projects_str'],
+            info['subtask_str'],
+            info['parent_deadlines'],
+        )
+        for info in designer_info_list
+    ]
+    # Designers sharing a parent task share its deadline, so each distinct string is parsed once.
+    unique_deadlines = list(set().union(*(deadlines for *_, deadlines in designer_rows)))
+    deadline_colors = {
+        d_str: "FF0000" if 0 <= delta < 7 else None
+        for d_str, delta in zip(unique_deadlines, days_until(unique_deadlines).tolist())
+    }
+    for name, capacity_str, projects_str, cats_str, deadlines in designer_rows:
+        # Format deadline cell with red font for urgent deadlines; adjacent text of the same colour shares a run.
+        pieces = []
         for j, d_str in enumerate(deadlines):
-            run = para.add_run(d_str)
-            try:
-                d_dt = pd.to_datetime(d_str)
-                delta = (d_dt - pd.Timestamp.now()).days
-                if 0 <= delta < 7:
-                    run.font.color.rgb = RGBColor(0xFF, 0x00, 0x00)
-            except Exception:
-                pass
-            if j < len(deadlines) - 1:
-                para.add_run(", ")
-        for cell in row_cells:
-            set_cell_margin(cell, margin=100)
+            if j:
+                pieces.append((", ", None))
+            pieces.append((d_str, deadline_colors[d_str]))
+        deadline_runs = [
+            ("".join(text for text, _ in group), color)
+            for color, group in itertools.groupby(pieces, key=operator.itemgetter(1))
+        ]
+        append_row(table, [name, capacity_str, projects_str, cats_str, deadline_runs])
     
     # ----------------- Aggregated Project Breakdown Section -----------------
     agg_heading = document.add_heading("Aggregated Project Breakdown", 1)
     set_collapsible(agg_heading)
-    agg_table = document.add_table(rows=1, cols=3)
-    agg_table.style = "Table Grid"
-    agg_hdr_cells = agg_table.rows[0].cells
-    agg_hdr_cells[0].text = "Project Type"
-    agg_hdr_cells[1].text = "Breakdown"
-    agg_hdr_cells[2].text = "Total"
-    for cell in agg_hdr_cells:
-        para = cell.paragraphs[0]
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        for run in para.runs:
-            run.bold = True
-        set_cell_shading(cell, fill="D9E1F2")
-        set_cell_margin(cell, margin=100)
-    set_column_widths(agg_table, [Inches(1.5), Inches(3.5), Inches(1)])
+    agg_table = add_report_table(document, 3)
+    build_tr(agg_table, [(header, HEADER_CELL) for header in ["Project Type", "Breakdown", "Total"]],
+             widths=[Inches(1.5), Inches(3.5), Inches(1)])
     for project_type, projects in aggregated_breakdown.items():
         breakdown_details = ", ".join(f"{proj} ({cnt})" for proj, cnt in projects.items())
-        total_count = sum(projects.values())
-        row_cells = agg_table.add_row().cells
-        row_cells[0].text = project_type
-        row_cells[1].text = breakdown_details
-        row_cells[2].text = str(total_count)
-        for cell in row_cells:
-            set_cell_margin(cell, margin=100)
+        append_row(agg_table, [project_type, breakdown_details, str(type_totals[project_type])])
     
     # ----------------- Deadline Breakdown Section -----------------
     deadline_heading = document.add_heading("Deadline Breakdown", 1)
     set_collapsible(deadline_heading)
     document.add_paragraph("")
-    deadlines_table = document.add_table(rows=1, cols=4)
-    deadlines_table.style = "Table Grid"
-    dt_hdr_cells = deadlines_table.rows[0].cells
+    deadlines_table = add_report_table(document, 4)
     dt_headers = ["Designer", "Project", "Project Type", "Deadline"]
-    for i, header in enumerate(dt_headers):
-        dt_hdr_cells[i].text = header
-        para = dt_hdr_cells[i].paragraphs[0]
-        para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        for run in dt_hdr_cells[i].paragraphs[0].runs:
-            run.bold = True
-        set_cell_shading(dt_hdr_cells[i], fill="D9E1F2")
-        set_cell_margin(dt_hdr_cells[i], margin=100)
-    set_column_widths(deadlines_table, [Inches(1.5), Inches(2), Inches(1.5), Inches(2)])
+    build_tr(deadlines_table, [(header, HEADER_CELL) for header in dt_headers],
+             widths=[Inches(1.5), Inches(2), Inches(1.5), Inches(2)])
     if not deadlines_details:
-        row_cells = deadlines_table.add_row().cells
-        merged = row_cells[0].merge(row_cells[3])
-        merged.text = "No deadline for the week"
-        for para in merged.paragraphs:
-            para.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            for run in para.runs:
-                run.bold = True
-        set_cell_margin(merged, margin=100)
+        build_tr(deadlines_table, [("No deadline for the week", {'bold': True, 'center': True, 'span': 4})],
+                 widths=[Inches(7)])
     else:
         for rec in deadlines_details:
-            row_cells = deadlines_table.add_row().cells
-            row_cells[0].text = rec.get('designer', "Unknown")
-            row_cells[1].text = rec.get('project', "N/A")
-            row_cells[2].text = rec.get('project_type', "N/A")
-            row_cells[3].text = rec.get('deadline', "N/A")
-            for cell in row_cells:
-                set_cell_margin(cell, margin=100)
+            append_row(deadlines_table, [
+                rec.get('designer') or "Unknown",
+                rec.get('project') or "N/A",
+                rec.get('project_type') or "N/A",
+                rec.get('deadline') or "N/A",
+            ])
     
     document.add_paragraph("")
-    pie_chart_buf = create_deadline_pie_chart(aggregated_deadlines)
+    pie_chart_buf = io.BytesIO(create_deadline_pie_chart(deadline_counts))
     document.add_picture(pie_chart_buf, width=Inches(5))
     
     buf = io.BytesIO()
@@ -678,6 +670,115 @@ def generate_better_word_doc(designer_info_list, aggregated_breakdown, aggregate
     return buf
 
 
+def make_designer_info(name, timesheet_hours, sched, sub_cats, parent_dds):
+    """
+    Builds one designer's summary dict; name_key is the precomputed sort key. Projects, categories and
+    deadlines are stored as sorted tuples, and the *_str values are their comma-joined display strings
+    shared by the report and the preview.
+    """
+    capacity, guess = get_availability_guess_coded(name, timesheet_hours, sched['hours'])
+    projects = tuple(sorted(sched['projects']))
+    subtask_categories = tuple(sorted(sub_cats))
+    parent_deadlines = tuple(sorted(parent_dds))
+    return {
+        'name': name,
+        'name_key': name.lower(),
+        'capacity': capacity,
+        'guess': guess,
+        'projects': projects,
+        'subtask_categories': subtask_categories,
+        'parent_deadlines': parent_deadlines,
+        'projects_str': ", ".join(projects) or "None",
+        'subtask_str': ", ".join(subtask_categories) or "None",
+        'deadlines_str': ", ".join(parent_deadlines) or "None"
+    }
+
+
+# Version 2: slots carry employee_id instead of resource_id.
+@disk_cache(ttl=REPORT_CACHE_TTL, version=2)
+def fetch_week_records(week_start_iso, week_end_iso, week_end_dt_str):
+    """
+    Authenticates and reads the week's raw Odoo data: (timesheet_dict, slots, tasks).
+    Results persist on disk for REPORT_CACHE_TTL, so they survive app restarts; see REPORT_CACHE_TTL for the
+    resulting staleness bound.
+    """
+    uid = get_odoo_uid()
+    # planning.slot bounds are datetimes covering whole days; timesheet dates stay date-only.
+    start_dt_str = f"{week_start_iso} 00:00:00"
+    end_dt_str = week_end_dt_str
+    pool = get_models_pool()
+    # Timesheets filter on the designer job title themselves, so they stay in flight on a worker
+    # while the slots and then their tasks are read on this thread.
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        timesheet_future = executor.submit(call_with_pooled_models, pool, get_all_timesheet_hours,
+                                           uid, week_start_iso, week_end_iso)
+        slots = call_with_pooled_models(pool, fetch_all_slots, uid, start_dt_str, end_dt_str)
+        tasks = call_with_pooled_models(pool, fetch_tasks_for_slots, uid, slots)
+        timesheet_dict = timesheet_future.result()
+    return timesheet_dict, slots, tasks
+
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, show_spinner=False)
+def build_report(week_start_iso, week_end_iso, week_end_dt_str):
+    """
+    Fetches the week's Odoo data and aggregates it.
+    Returns (designer_info_list, aggregated_breakdown, deadline_counts, deadlines_details),
+    or None when no designers are planned for the week.
+    Results are cached per week, so repeated runs skip Odoo.
+    """
+    timesheet_dict, slots, tasks = fetch_week_records(week_start_iso, week_end_iso, week_end_dt_str)
+    emp_names = get_designers_from_slots(slots)
+    if not emp_names:
+        return None
+    slot_frame = build_slot_frame(slots, tasks)
+    scheduled_dict = get_all_scheduled_data(slot_frame)
+    subtask_cat_dict = get_subtask_service_categories(slot_frame)
+    parent_dd_dict = get_parent_task_due_dates(slot_frame)
+    project_breakdown_dict = get_project_breakdown(slot_frame)
+    deadlines_details = get_deadlines_for_week(slot_frame, emp_names)
+    aggregated_breakdown = aggregate_project_breakdowns(project_breakdown_dict)
+    aggregated_deadlines = Counter(itertools.chain.from_iterable(
+        parent_dd_dict.get(emp_id, ()) for emp_id in emp_names))
+    timesheet_get = timesheet_dict.get
+    scheduled_get = scheduled_dict.get
+    subtask_cat_get = subtask_cat_dict.get
+    parent_dd_get = parent_dd_dict.get
+    no_schedule = {'hours': 0.0, 'projects': frozenset()}
+    designer_info_list = [
+        make_designer_info(name or 'Unknown', timesheet_get(emp_id, 0.0), scheduled_get(emp_id, no_schedule),
+                           subtask_cat_get(emp_id, frozenset()), parent_dd_get(emp_id, frozenset()))
+        for emp_id, name in emp_names.items()
+    ]
+    designer_info_list.sort(key=operator.itemgetter('name_key'))
+    deadline_counts = bucket_deadlines(aggregated_deadlines)
+    return designer_info_list, aggregated_breakdown, deadline_counts, deadlines_details
+
+
+@st.cache_data(ttl=REPORT_CACHE_TTL, show_spinner=False)
+def build_report_doc(week_start_iso, week_end_iso, week_end_dt_str):
+    """Renders the Word report for a week from the cached build_report data and returns its bytes."""
+    report = build_report(week_start_iso, week_end_iso, week_end_dt_str)
+    # The cache keeps only the bytes; closing the buffer frees its copy straight away.
+    with generate_better_word_doc(*report) as doc_buffer:
+        return doc_buffer.getvalue()
+
+
+@st.fragment
+def render_download(week_start_iso, week_end_iso, week_end_dt_str):
+    """
+    Generates the Word report and shows its download button.
+    Runs as a fragment so clicking the button reruns only this block and the preview stays on screen.
+    """
+    with st.spinner("Preparing the Word report..."):
+        doc_bytes = build_report_doc(week_start_iso, week_end_iso, week_end_dt_str)
+    st.download_button(
+        label="Download Capacity Tracker",
+        data=doc_bytes,
+        file_name="Capacity_Tracker.docx",
+        mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    )
+
+
 def main():
     st.title("Designer Capacity & Availability Tracker")
     st.write(
@@ -687,80 +788,51 @@ def main():
     )
     
     if st.button("Run Analysis"):
-        with st.spinner("Authenticating with Odoo..."):
-            uid, models = authenticate_odoo()
-        start_of_week, end_of_week = get_sunday_friday_range()
-        start_date_str = start_of_week.strftime("%Y-%m-%d")
-        end_date_str = end_of_week.strftime("%Y-%m-%d")
-        with st.spinner(f"Retrieving designers for {start_date_str} to {end_date_str}..."):
-            relevant_designer_ids = get_designer_ids_from_planning(models, uid, start_date_str, end_date_str)
-            if not relevant_designer_ids:
-                st.warning("No designers found in planning slots for this week.")
-                return
-        with st.spinner("Reading employee info..."):
-            employees = read_employee_info(models, uid, relevant_designer_ids)
-        employee_dict = {emp['id']: emp for emp in employees}
-        designer_ids = list(employee_dict.keys())
-        with st.spinner("Fetching timesheet data..."):
-            timesheet_dict = get_all_timesheet_hours(models, uid, designer_ids, start_date_str, end_date_str)
-        with st.spinner("Fetching scheduled data..."):
-            scheduled_dict = get_all_scheduled_data(models, uid, designer_ids, start_date_str, end_date_str)
-        with st.spinner("Fetching subtask service categories..."):
-            subtask_cat_dict = get_subtask_service_categories(models, uid, designer_ids, start_date_str, end_date_str)
-        with st.spinner("Fetching parent task deadlines..."):
-            parent_dd_dict = get_parent_task_due_dates(models, uid, designer_ids, start_date_str, end_date_str)
-        with st.spinner("Fetching project breakdown..."):
-            project_breakdown_dict = get_project_breakdown(models, uid, designer_ids, start_date_str, end_date_str)
-        aggregated_breakdown = aggregate_project_breakdowns(project_breakdown_dict)
-        aggregated_deadlines = []
-        for emp_id in designer_ids:
-            aggregated_deadlines.extend(list(parent_dd_dict.get(emp_id, set())))
-        deadlines_details = get_deadlines_for_week(models, uid, designer_ids, start_date_str, end_date_str)
-        designer_info_list = []
-        for emp_id in designer_ids:
-            emp = employee_dict.get(emp_id)
-            if not emp:
-                continue
-            name = emp.get('name', 'Unknown')
-            timesheet_hours = timesheet_dict.get(emp_id, 0.0)
-            sched = scheduled_dict.get(emp_id, {'hours': 0.0, 'projects': set()})
-            scheduled_hours = sched['hours']
-            projects = sched['projects']
-            sub_cats = subtask_cat_dict.get(emp_id, set())
-            parent_dds = parent_dd_dict.get(emp_id, set())
-            capacity, guess = get_availability_guess_coded(name, timesheet_hours, scheduled_hours)
-            designer_info_list.append({
-                'name': name,
-                'capacity': capacity,
-                'guess': guess,
-                'projects': projects,
-                'subtask_categories': sub_cats,
-                'parent_deadlines': parent_dds
-            })
-        designer_info_list.sort(key=lambda x: x['name'].lower())
-        with st.spinner("Generating Word document..."):
-            doc_buffer = generate_better_word_doc(designer_info_list, aggregated_breakdown, aggregated_deadlines, deadlines_details)
-        st.success(f"Analysis complete for {start_date_str} to {end_date_str}!")
-        st.download_button(
-            label="Download Capacity Tracker",
-            data=doc_buffer,
-            file_name="Capacity_Tracker.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+        start_of_week, end_of_week, end_inclusive_dt = get_sunday_friday_range()
+        # Kept in session state so the preview survives reruns triggered by other widgets.
+        st.session_state['report_week'] = (
+            start_of_week.strftime("%Y-%m-%d"),
+            end_of_week.strftime("%Y-%m-%d"),
+            end_inclusive_dt.strftime("%Y-%m-%d %H:%M:%S"),
         )
-        st.header("Capacity Tracker Preview")
-        st.write(f"**Date Range:** {start_date_str} to {end_date_str}")
-        for info in designer_info_list:
-            st.subheader(info['name'])
-            st.write(f"**Available Hours:** {info['capacity']:.1f}, **Availability:** {info['guess']}")
-            st.write(f"**Projects:** {', '.join(sorted(info['projects'])) if info['projects'] else 'None'}")
-            st.write(f"**Project Type:** {', '.join(sorted(info['subtask_categories'])) if info['subtask_categories'] else 'None'}")
-            st.write(f"**Deadline:** {', '.join(sorted(info['parent_deadlines'])) if info['parent_deadlines'] else 'None'}")
-            st.write("---")
-        st.subheader("Aggregated Project Breakdown")
-        agg_total, agg_breakdown_text = format_project_breakdown_for_employee(aggregated_breakdown)
-        st.write(f"Working on {agg_total} project entries: {agg_breakdown_text}")
-        st.subheader("Deadline Breakdown (Pie Chart)")
-        st.image(create_deadline_pie_chart(aggregated_deadlines), width=500)
+    if 'report_week' not in st.session_state:
+        return
+    start_date_str, end_date_str, end_dt_str = st.session_state['report_week']
+    with st.spinner(f"Fetching Odoo data for {start_date_str} to {end_date_str}..."):
+        report = build_report(start_date_str, end_date_str, end_dt_str)
+    if report is None:
+        st.warning("No designers found in planning slots for this week.")
+        return
+    designer_info_list, aggregated_breakdown, deadline_counts, _ = report
+    st.success(f"Analysis complete for {start_date_str} to {end_date_str}!")
+    # Filled after the preview, so the preview shows before the document is generated.
+    download_area = st.container()
+    st.header("Capacity Tracker Preview")
+    st.write(f"**Date Range:** {start_date_str} to {end_date_str}")
+    # One virtualized table for all designers instead of a markdown section each.
+    st.dataframe(
+        [
+            {
+                "Designer": info['name'],
+                "Available Hours": info['capacity'],
+                "Availability": info['guess'],
+                "Projects": info['projects_str'],
+                "Project Type": info['subtask_str'],
+                "Deadline": info['deadlines_str'],
+            }
+            for info in designer_info_list
+        ],
+        use_container_width=True,
+        hide_index=True,
+        column_config={"Available Hours": st.column_config.NumberColumn(format="%.1f")},
+    )
+    st.subheader("Aggregated Project Breakdown")
+    agg_total, agg_breakdown_text = format_project_breakdown_for_employee(aggregated_breakdown)
+    st.write(f"Working on {agg_total} project entries: {agg_breakdown_text}")
+    st.subheader("Deadline Breakdown (Pie Chart)")
+    st.image(create_deadline_pie_chart(deadline_counts), width=500)
+    with download_area:
+        render_download(start_date_str, end_date_str, end_dt_str)
 
 if __name__ == "__main__":
     main()